@@ -6,39 +6,124 @@ Simple graphical interface with logs, progress bar and start button.
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
-import queue
+import collections
 import sys
 import os
+import re
+import time
 from datetime import datetime
 import subprocess
 from dotenv import load_dotenv
 import configparser
+import json
 import base64
 from PIL import Image, ImageTk
 
 
+# Étapes détectées dans les logs de pass-schedule-pdf.py : (pattern, progression, libellé)
+STEP_PATTERNS = (
+    ("starting schedule pdf generation", 20, "Démarrage du processus"),
+    ("configuration validated", 25, "Configuration validée"),
+    ("chrome browser started", 30, "Navigateur lancé"),
+    ("connecting to pass", 35, "Connexion à PASS"),
+    ("login successful", 45, "Connexion réussie"),
+    ("navigating to schedule", 50, "Accès à l'emploi du temps"),
+    ("navigation successful", 60, "Navigation terminée"),
+    ("generating pdf", 70, "Génération du PDF en cours"),
+    ("pdf generated successfully", 85, "PDF généré avec succès"),
+    ("pdf de l'emploi du temps généré avec succès", 95, "Génération terminée"),
+    ("schedule pdf generation completed", 100, "Processus terminé"),
+)
+
+STEP_TABLE = {pattern: (progress, step_text) for pattern, progress, step_text in STEP_PATTERNS}
+# Step messages start with the pattern, optionally after an emoji prefix: an
+# anchored match fails on the first characters instead of scanning the whole line
+STEP_RE = re.compile(
+    r"(?:\S+ )?(" + "|".join(re.escape(pattern) for pattern in STEP_TABLE) + ")",
+    re.IGNORECASE
+)
+
+# Step phrases always appear within the first characters of a line
+STEP_SCAN_LENGTH = 256
+
+# Every step message printed by the script starts with one of these
+STEP_LINE_PREFIXES = ('✅', '🚀', '📄', '🧭', '🎉', 'Connecting', 'Navigating')
+
+
 class PDFGeneratorGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("PASS Schedule PDF Generator")
-        self.root.geometry("800x900")  # Increased height to accommodate all settings and progress
+        # Window size increased to accommodate all settings and progress,
+        # centered on screen from the known size (no layout pass needed)
+        width, height = 800, 900
+        x = (self.root.winfo_screenwidth() - width) // 2
+        y = (self.root.winfo_screenheight() - height) // 2
+        self.root.geometry(f"{width}x{height}+{x}+{y}")
         self.root.resizable(True, True)
         
         # Communication queue between threads
-        self.log_queue = queue.Queue()
+        # (deque append/popleft are thread-safe, no locking needed)
+        self.log_queue = collections.deque()
+        
+        # The UI thread is woken up by a virtual event when messages arrive
+        self._wakeup_pending = False
+        self.root.bind("<<LogMsg>>", lambda event: self.process_queue())
+        
+        # Log area is capped so inserts stay fast during long runs
+        self.max_log_lines = 5000
+        self._log_line_count = 0
+        
+        # Last formatted log timestamp, reused within the same second
+        self._last_ts_sec = None
+        self._last_ts_str = ""
         
         # Progress tracking
         self.is_running = False
         
-        # Settings file path
-        self.settings_file = "settings.ini"
+        # Settings file path (the old INI file is only read to migrate it)
+        self.settings_file = "settings.json"
+        self.legacy_settings_file = "settings.ini"
         
-        # Flag to prevent auto-save indication during loading
-        self.loading_settings = False
+        # In-memory settings, parsed once and kept in sync with the file
+        self._settings = {'PASS': {}, 'PERSONAL': {}, 'PDF': {}}
+        self._settings_mtime = None
+        self._last_written = None
         
         # Track original password to detect real changes
         self.original_password = ""
         
+        # Last loaded/saved values of the other fields, same purpose
+        self.original_settings = None
+        
+        # Last (plaintext, base64) password pair, avoids re-encoding on every save
+        self._pw_cache = (None, None)
+        
+        # Pending debounced save button update (Tk after id)
+        self._dirty_after_id = None
+        
+        # Created by setup_ui, change callbacks check it before use
+        self.save_settings_btn = None
+        
+        # Interpreter and script used for generation, resolved once
+        self._cwd = os.getcwd()
+        self._python_exe, self._script_path = self.resolve_python_exe()
+        
+        # Output folder, resolved (and created) the first time it is needed
+        self._save_folder = None
+        
+        # File explorer launcher for the current platform (non-blocking)
+        if os.name == 'nt':  # Windows
+            self._open_folder = os.startfile
+        elif sys.platform == 'darwin':
+            self._open_folder = lambda path: subprocess.Popen(['open', path])
+        else:
+            self._open_folder = lambda path: subprocess.Popen(['xdg-open', path])
+        
+        # Load environment variables in the background while the UI is built
+        self._env_ready = threading.Event()
+        threading.Thread(target=self.load_env_thread, daemon=True).start()
+        
         # Setup UI
         self.setup_ui()
         
@@ -46,10 +131,35 @@ class PDFGeneratorGUI:
         self.load_settings()
         
         # Start queue processing
-        self.process_queue()
+        self.poll_queue()
         
-        # Load environment variables
-        load_dotenv()
+    def resolve_python_exe(self):
+        """Find the Python interpreter and script path used to run the generator"""
+        # Get Python executable path (use current Python interpreter)
+        python_exe = sys.executable
+        
+        # Si on détecte qu'on est dans un venv, utilisons l'exécutable du venv
+        if hasattr(sys, 'real_prefix') or (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix):
+            # Nous sommes dans un environnement virtuel
+            print(f"📦 Virtual environment detected: {python_exe}")
+        else:
+            # Essayer de trouver le venv local
+            venv_python = os.path.join(self._cwd, ".venv", "Scripts", "python.exe")
+            if os.path.exists(venv_python):
+                python_exe = venv_python
+                print(f"📦 Using local virtual environment: {python_exe}")
+            else:
+                print(f"🐍 Using system Python: {python_exe}")
+                print("⚠️  Warning: Make sure all dependencies are installed in system Python")
+        
+        return python_exe, "pass-schedule-pdf.py"
+    
+    def load_env_thread(self):
+        """Parse the .env file and signal when its values are available"""
+        try:
+            load_dotenv()
+        finally:
+            self._env_ready.set()
         
     def setup_ui(self):
         """Create the user interface"""
@@ -79,13 +189,20 @@ class PDFGeneratorGUI:
         # Logo
         try:
             logo_path = os.path.join("resources", "fiplogopixel.png")
+            logo_cache_path = os.path.join("resources", "fiplogopixel_80.png")
             if os.path.exists(logo_path):
-                # Load and resize logo
-                logo_image = Image.open(logo_path)
-                # Resize to reasonable size (max 80px height)
-                logo_height = 80
-                logo_width = int(logo_image.width * logo_height / logo_image.height)
-                logo_image = logo_image.resize((logo_width, logo_height), Image.Resampling.LANCZOS)
+                if (os.path.exists(logo_cache_path)
+                        and os.path.getmtime(logo_cache_path) >= os.path.getmtime(logo_path)):
+                    # Reuse the logo resized by a previous launch
+                    logo_image = Image.open(logo_cache_path)
+                else:
+                    # Load and shrink logo to a reasonable size (max 80px height)
+                    logo_image = Image.open(logo_path)
+                    logo_image.thumbnail((500, 80), Image.Resampling.LANCZOS)
+                    try:
+                        logo_image.save(logo_cache_path, optimize=True)
+                    except OSError as e:
+                        print(f"Could not cache resized logo: {e}")
                 self.logo_photo = ImageTk.PhotoImage(logo_image)
                 
                 logo_label = ttk.Label(header_frame, image=self.logo_photo)
@@ -109,16 +226,16 @@ class PDFGeneratorGUI:
         # PASS Username field
         ttk.Label(settings_frame, text="Nom d'utilisateur PASS:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
         self.username_var = tk.StringVar()
-        self.username_var.trace('w', self.on_setting_changed)
         self.username_entry = ttk.Entry(settings_frame, textvariable=self.username_var, width=30)
         self.username_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(0, 10))
+        self.bind_edit_events(self.username_entry, self.on_setting_changed)
         
         # PASS Password field
         ttk.Label(settings_frame, text="Mot de passe PASS:").grid(row=1, column=0, sticky=tk.W, padx=(0, 10), pady=(5, 0))
         self.password_var = tk.StringVar()
-        self.password_var.trace('w', self.on_password_changed)  # Special handler for password
         self.password_entry = ttk.Entry(settings_frame, textvariable=self.password_var, show="*", width=30)
         self.password_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=(0, 10), pady=(5, 0))
+        self.bind_edit_events(self.password_entry, self.on_password_changed)  # Special handler for password
         
         # Save password checkbox
         self.save_password_var = tk.BooleanVar()
@@ -136,19 +253,18 @@ class PDFGeneratorGUI:
         # Personal information section
         ttk.Label(settings_frame, text="Nom et Prénom:").grid(row=4, column=0, sticky=tk.W, padx=(0, 10))
         self.nom_prenom_var = tk.StringVar()
-        self.nom_prenom_var.trace('w', self.on_setting_changed)
         self.nom_prenom_entry = ttk.Entry(settings_frame, textvariable=self.nom_prenom_var, width=30)
         self.nom_prenom_entry.grid(row=4, column=1, sticky=(tk.W, tk.E), padx=(0, 10))
+        self.bind_edit_events(self.nom_prenom_entry, self.on_setting_changed)
         
         ttk.Label(settings_frame, text="Promotion:").grid(row=5, column=0, sticky=tk.W, padx=(0, 10), pady=(5, 0))
         self.promo_var = tk.StringVar()
-        self.promo_var.trace('w', self.on_setting_changed)
         self.promo_entry = ttk.Entry(settings_frame, textvariable=self.promo_var, width=30)
         self.promo_entry.grid(row=5, column=1, sticky=(tk.W, tk.E), padx=(0, 10), pady=(5, 0))
+        self.bind_edit_events(self.promo_entry, self.on_setting_changed)
         
         ttk.Label(settings_frame, text="Semaine cible:").grid(row=6, column=0, sticky=tk.W, padx=(0, 10), pady=(5, 0))
         self.target_week_var = tk.StringVar()
-        self.target_week_var.trace('w', self.on_setting_changed)
         self.target_week_spinbox = ttk.Spinbox(
             settings_frame, 
             textvariable=self.target_week_var, 
@@ -158,6 +274,9 @@ class PDFGeneratorGUI:
             justify='center'
         )
         self.target_week_spinbox.grid(row=6, column=1, sticky=tk.W, padx=(0, 10), pady=(5, 0))
+        self.bind_edit_events(self.target_week_spinbox, self.on_setting_changed)
+        for sequence in ('<<Increment>>', '<<Decrement>>'):
+            self.target_week_spinbox.bind(sequence, self.on_setting_changed, add='+')
         
         # Add current week info
         current_week = datetime.now().isocalendar()[1]
@@ -175,19 +294,19 @@ class PDFGeneratorGUI:
         # PDF settings section
         ttk.Label(settings_frame, text="Message PDF:").grid(row=8, column=0, sticky=tk.W, padx=(0, 10))
         self.pdf_message_var = tk.StringVar()
-        self.pdf_message_var.trace('w', self.on_setting_changed)
         self.pdf_message_entry = ttk.Entry(settings_frame, textvariable=self.pdf_message_var, width=30)
         self.pdf_message_entry.grid(row=8, column=1, sticky=(tk.W, tk.E), padx=(0, 10))
+        self.bind_edit_events(self.pdf_message_entry, self.on_setting_changed)
         
         ttk.Label(settings_frame, text="Fichier signature:").grid(row=9, column=0, sticky=tk.W, padx=(0, 10), pady=(5, 0))
         self.signature_file_var = tk.StringVar()
-        self.signature_file_var.trace('w', self.on_setting_changed)
         signature_frame = ttk.Frame(settings_frame)
         signature_frame.grid(row=9, column=1, sticky=(tk.W, tk.E), padx=(0, 10), pady=(5, 0))
         signature_frame.columnconfigure(0, weight=1)
         
         self.signature_file_entry = ttk.Entry(signature_frame, textvariable=self.signature_file_var)
         self.signature_file_entry.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=(0, 5))
+        self.bind_edit_events(self.signature_file_entry, self.on_setting_changed)
         
         self.browse_signature_btn = ttk.Button(signature_frame, text="Parcourir", command=self.browse_signature_file)
         self.browse_signature_btn.grid(row=0, column=1)
@@ -303,93 +422,165 @@ class PDFGeneratorGUI:
             self.signature_file_var.set(filename)
             self.save_settings()
     
+    def bind_edit_events(self, widget, callback):
+        """Call callback on user edits only (programmatic sets are not reported)"""
+        for sequence in ('<KeyRelease>', '<<Paste>>', '<<Cut>>'):
+            widget.bind(sequence, callback, add='+')
+    
     def on_password_changed(self, *args):
         """Called when password field changes - only triggers save indication if save password is enabled"""
-        # Ignore changes during settings loading
-        if self.loading_settings:
-            return
-        
         # Only trigger save indication if save password is checked
         if self.save_password_var.get():
             # Check if password actually changed from original
             current_password = self.password_var.get()
             if current_password != self.original_password:
-                # Change save button text to indicate unsaved changes
-                if hasattr(self, 'save_settings_btn'):
-                    self.save_settings_btn.config(text="💾 Sauvegarder*", state="normal")
+                self.schedule_dirty_state()
+    
+    def get_setting_values(self):
+        """Return the current values of the non-password setting fields"""
+        return (self.username_var.get(), self.nom_prenom_var.get(), self.promo_var.get(),
+                self.target_week_var.get(), self.pdf_message_var.get(),
+                self.signature_file_var.get())
     
     def on_setting_changed(self, *args):
-        """Called when any setting field changes - enables auto-save"""
-        # Ignore changes during settings loading
-        if self.loading_settings:
+        """Called when any setting field is edited - enables auto-save"""
+        # The value is compared in apply_dirty_state: widget bindings run before the
+        # class bindings (e.g. the spinbox arrows) have updated it
+        self.schedule_dirty_state()
+    
+    def schedule_dirty_state(self):
+        """Debounce field changes so rapid typing results in a single UI update"""
+        if self._dirty_after_id is not None:
+            self.root.after_cancel(self._dirty_after_id)
+        self._dirty_after_id = self.root.after(300, self.apply_dirty_state)
+    
+    def cancel_dirty_state(self):
+        """Drop any pending save button update"""
+        if self._dirty_after_id is not None:
+            self.root.after_cancel(self._dirty_after_id)
+            self._dirty_after_id = None
+    
+    def apply_dirty_state(self):
+        """Change save button text to indicate unsaved changes"""
+        self._dirty_after_id = None
+        # Tab, Shift, arrows... also fire <KeyRelease>: ignore them if nothing changed
+        password_changed = (self.save_password_var.get()
+                            and self.password_var.get() != self.original_password)
+        if not password_changed and self.get_setting_values() == self.original_settings:
             return
-            
-        # Change save button text to indicate unsaved changes
-        if hasattr(self, 'save_settings_btn'):
+        if self.save_settings_btn is not None:
             self.save_settings_btn.config(text="💾 Sauvegarder*", state="normal")
         
-    def load_settings(self):
-        """Load settings from INI file"""
-        self.loading_settings = True  # Disable change tracking during loading
+    def read_settings_file(self):
+        """Read settings.json, returns None if it does not exist"""
+        try:
+            with open(self.settings_file, encoding='utf-8') as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            return None
+        # Valid JSON is not enough: the code below indexes the sections as dicts
+        if not isinstance(settings, dict) or not all(
+                isinstance(settings.get(section, {}), dict) for section in ['PASS', 'PERSONAL', 'PDF']):
+            raise ValueError("settings.json must contain an object with PASS, PERSONAL and PDF sections")
+        self._settings_mtime = self.get_settings_mtime()
+        return settings
+    
+    def read_legacy_settings(self):
+        """Read the old settings.ini file, returns None if it does not exist"""
         config = configparser.ConfigParser()
+        if not config.read(self.legacy_settings_file, encoding='utf-8'):
+            return None
         
-        if os.path.exists(self.settings_file):
-            try:
-                config.read(self.settings_file, encoding='utf-8')
+        settings = {section: dict(config.items(section)) for section in config.sections()}
+        if config.has_option('PASS', 'save_password'):
+            settings['PASS']['save_password'] = config.getboolean('PASS', 'save_password')
+        return settings
+    
+    def load_settings(self):
+        """Load settings from JSON file"""
+        migrated = False
+        
+        try:
+            settings = self.read_settings_file()
+            if settings is None:
+                settings = self.read_legacy_settings()
+                migrated = settings is not None
+            
+            settings_found = settings is not None
+            if settings_found:
+                for section in ['PASS', 'PERSONAL', 'PDF']:
+                    settings.setdefault(section, {})
+                self._settings = settings
+                pass_settings = settings['PASS']
+                personal_settings = settings['PERSONAL']
+                pdf_settings = settings['PDF']
                 
                 # Load PASS credentials
-                if config.has_option('PASS', 'username'):
-                    self.username_var.set(config.get('PASS', 'username'))
+                if 'username' in pass_settings:
+                    self.username_var.set(pass_settings['username'])
                 
                 # Load password if saved
-                if config.has_option('PASS', 'save_password'):
-                    save_password = config.getboolean('PASS', 'save_password')
+                if 'save_password' in pass_settings:
+                    save_password = bool(pass_settings['save_password'])
                     self.save_password_var.set(save_password)
                     
-                    if save_password and config.has_option('PASS', 'password'):
+                    if save_password and 'password' in pass_settings:
                         # Decode password (simple base64 encoding)
-                        encoded_password = config.get('PASS', 'password')
+                        encoded_password = pass_settings['password']
                         try:
-                            password = base64.b64decode(encoded_password.encode()).decode()
+                            if encoded_password == self._pw_cache[1]:
+                                password = self._pw_cache[0]
+                            else:
+                                password = base64.b64decode(encoded_password.encode()).decode()
+                                self._pw_cache = (password, encoded_password)
                             self.password_var.set(password)
                             self.original_password = password  # Track original password
                         except Exception as e:
                             self.log_message(f"⚠️ Erreur lors du décodage du mot de passe: {e}")
                 
                 # Load personal information
-                if config.has_option('PERSONAL', 'nom_prenom'):
-                    self.nom_prenom_var.set(config.get('PERSONAL', 'nom_prenom'))
-                if config.has_option('PERSONAL', 'promo'):
-                    self.promo_var.set(config.get('PERSONAL', 'promo'))
-                if config.has_option('PERSONAL', 'target_week'):
-                    self.target_week_var.set(config.get('PERSONAL', 'target_week'))
+                if 'nom_prenom' in personal_settings:
+                    self.nom_prenom_var.set(personal_settings['nom_prenom'])
+                if 'promo' in personal_settings:
+                    self.promo_var.set(personal_settings['promo'])
+                if 'target_week' in personal_settings:
+                    self.target_week_var.set(personal_settings['target_week'])
                 
                 # Load PDF settings
-                if config.has_option('PDF', 'message'):
-                    self.pdf_message_var.set(config.get('PDF', 'message'))
-                if config.has_option('PDF', 'signature_file'):
-                    self.signature_file_var.set(config.get('PDF', 'signature_file'))
+                if 'message' in pdf_settings:
+                    self.pdf_message_var.set(pdf_settings['message'])
+                if 'signature_file' in pdf_settings:
+                    self.signature_file_var.set(pdf_settings['signature_file'])
                 
-                self.log_message("✅ Paramètres chargés depuis settings.ini")
+                if migrated:
+                    # Write the migrated values to settings.json right away
+                    self.save_settings()
+                    self.log_message("✅ Paramètres migrés de settings.ini vers settings.json")
+                else:
+                    self.log_message("✅ Paramètres chargés depuis settings.json")
                 
-            except Exception as e:
-                self.log_message(f"⚠️ Erreur lors du chargement des paramètres: {e}")
-        else:
-            # Load defaults from .env file if settings.ini doesn't exist
+        except Exception as e:
+            # The file exists but could not be parsed
+            settings_found = True
+            self.log_message(f"⚠️ Erreur lors du chargement des paramètres: {e}")
+        
+        if not settings_found:
+            # Load defaults from .env file if settings.json doesn't exist
             self.load_defaults_from_env()
-            self.log_message("📝 Fichier settings.ini non trouvé - chargement des valeurs par défaut depuis .env")
-            # Auto-save the defaults to create the ini file
+            self.log_message("📝 Fichier settings.json non trouvé - chargement des valeurs par défaut depuis .env")
+            # Auto-save the defaults to create the settings file
             self.save_settings()
         
-        # Re-enable change tracking after loading is complete
-        self.loading_settings = False
-        
         # Ensure save button starts disabled after loading
-        if hasattr(self, 'save_settings_btn'):
+        self.original_settings = self.get_setting_values()
+        self.cancel_dirty_state()
+        if self.save_settings_btn is not None:
             self.save_settings_btn.config(text="💾 Sauvegarder", state="disabled")
     
     def load_defaults_from_env(self):
         """Load default values from .env file"""
+        self._env_ready.wait()
+        
         # Load username/password from .env
         username = os.getenv('IMT_USERNAME', '')
         password = os.getenv('IMT_PASSWORD', '')
@@ -414,64 +605,94 @@ class PDFGeneratorGUI:
             "Réinitialiser tous les paramètres aux valeurs par défaut ?\n\nCela remplacera tous les paramètres actuels."
         )
         if result:
-            self.loading_settings = True  # Disable change tracking during reset
             self.load_defaults_from_env()
             self.original_password = self.password_var.get()  # Update original after reset
-            self.loading_settings = False  # Re-enable change tracking
+            self.original_settings = self.get_setting_values()
             # Reset save button since we just loaded defaults
-            if hasattr(self, 'save_settings_btn'):
+            self.cancel_dirty_state()
+            if self.save_settings_btn is not None:
                 self.save_settings_btn.config(text="💾 Sauvegarder", state="disabled")
             self.log_message("🔄 Paramètres réinitialisés aux valeurs par défaut")
     
     def save_settings_manually(self):
         """Save settings manually when user clicks save button"""
         self.save_settings()
-        # Update original password after successful save
+        # Update original values after successful save
         self.original_password = self.password_var.get()
+        self.original_settings = self.get_setting_values()
+        self.cancel_dirty_state()
         self.save_settings_btn.config(text="💾 Sauvegarder", state="disabled")
         messagebox.showinfo("Succès", "Paramètres sauvegardés avec succès !")
     
+    def get_settings_mtime(self):
+        """Return the modification time of the settings file, or None if missing"""
+        try:
+            return os.stat(self.settings_file).st_mtime
+        except OSError:
+            return None
+    
     def save_settings(self):
-        """Save settings to INI file"""
-        config = configparser.ConfigParser()
-        
-        # Load existing settings first
-        if os.path.exists(self.settings_file):
-            config.read(self.settings_file, encoding='utf-8')
+        """Save settings to JSON file"""
+        # Re-read only if the file was changed outside of the application
+        mtime = self.get_settings_mtime()
+        if mtime != self._settings_mtime:
+            if mtime is not None:
+                try:
+                    self._settings = self.read_settings_file() or self._settings
+                except ValueError as e:
+                    self.log_message(f"⚠️ settings.json invalide, il sera remplacé: {e}")
+            # The file no longer matches what we last wrote
+            self._last_written = None
         
         # Ensure sections exist
+        settings = self._settings
         for section in ['PASS', 'PERSONAL', 'PDF']:
-            if not config.has_section(section):
-                config.add_section(section)
+            settings.setdefault(section, {})
         
         # Save PASS credentials
-        config.set('PASS', 'username', self.username_var.get())
-        config.set('PASS', 'save_password', str(self.save_password_var.get()))
+        pass_settings = settings['PASS']
+        pass_settings['username'] = self.username_var.get()
+        pass_settings['save_password'] = self.save_password_var.get()
         
         # Save password if requested
         if self.save_password_var.get():
             password = self.password_var.get()
             if password:
-                encoded_password = base64.b64encode(password.encode()).decode()
-                config.set('PASS', 'password', encoded_password)
+                if password == self._pw_cache[0]:
+                    encoded_password = self._pw_cache[1]
+                else:
+                    encoded_password = base64.b64encode(password.encode()).decode()
+                    self._pw_cache = (password, encoded_password)
+                pass_settings['password'] = encoded_password
         else:
             # Remove password if not saving
-            if config.has_option('PASS', 'password'):
-                config.remove_option('PASS', 'password')
+            pass_settings.pop('password', None)
         
         # Save personal information
-        config.set('PERSONAL', 'nom_prenom', self.nom_prenom_var.get())
-        config.set('PERSONAL', 'promo', self.promo_var.get())
-        config.set('PERSONAL', 'target_week', self.target_week_var.get())
+        settings['PERSONAL']['nom_prenom'] = self.nom_prenom_var.get()
+        settings['PERSONAL']['promo'] = self.promo_var.get()
+        settings['PERSONAL']['target_week'] = self.target_week_var.get()
         
         # Save PDF settings
-        config.set('PDF', 'message', self.pdf_message_var.get())
-        config.set('PDF', 'signature_file', self.signature_file_var.get())
+        settings['PDF']['message'] = self.pdf_message_var.get()
+        settings['PDF']['signature_file'] = self.signature_file_var.get()
+        
+        # Skip the write entirely when nothing changed since the last save
+        data = json.dumps(settings, indent=4, ensure_ascii=False)
+        if data == self._last_written:
+            self.original_settings = self.get_setting_values()
+            return
         
         try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                config.write(f)
-            self.log_message("💾 Paramètres sauvegardés dans settings.ini")
+            # Write to a temporary file first so a crash never leaves a truncated file
+            temp_file = self.settings_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(temp_file, self.settings_file)
+            self._last_written = data
+            self._settings_mtime = self.get_settings_mtime()
+            self.original_settings = self.get_setting_values()
+            self.log_message("💾 Paramètres sauvegardés dans settings.json")
         except Exception as e:
             self.log_message(f"❌ Erreur lors de la sauvegarde: {e}")
     
@@ -494,20 +715,24 @@ class PDFGeneratorGUI:
             # If we're now saving passwords, check if current password differs from original
             current_password = self.password_var.get()
             if current_password != self.original_password:
-                if hasattr(self, 'save_settings_btn'):
+                if self.save_settings_btn is not None:
                     self.save_settings_btn.config(text="💾 Sauvegarder*", state="normal")
         
         # Just mark as needing save for the checkbox change itself
-        if hasattr(self, 'save_settings_btn'):
+        if self.save_settings_btn is not None:
             self.save_settings_btn.config(text="💾 Sauvegarder*", state="normal")
         
     def log_message(self, message):
         """Add a message to the log area"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        # Format the timestamp at most once per second
+        now = int(time.time())
+        if now != self._last_ts_sec:
+            self._last_ts_str = time.strftime("%H:%M:%S", time.localtime(now))
+            self._last_ts_sec = now
+        timestamp = self._last_ts_str
         formatted_message = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, formatted_message)
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        # Displayed by process_queue together with the other pending lines
+        self.post_message(('log', formatted_message))
         
     def update_progress(self, value, step=""):
         """Update progress bar and current step"""
@@ -521,7 +746,7 @@ class PDFGeneratorGUI:
         required_modules = [
             ('selenium', 'Selenium WebDriver'),
             ('reportlab', 'ReportLab PDF library'),
-            ('PyPDF2', 'PyPDF2 library'),
+            ('pikepdf', 'pikepdf library'),
             ('dotenv', 'python-dotenv'),
             ('PIL', 'Pillow (PIL)')
         ]
@@ -538,7 +763,7 @@ class PDFGeneratorGUI:
             error_message = "Modules manquants pour la génération PDF :\n\n"
             error_message += "\n".join(f"• {module}" for module in missing_modules)
             error_message += "\n\nInstallez-les avec :\n"
-            error_message += "pip install selenium reportlab PyPDF2 python-dotenv pillow"
+            error_message += "pip install selenium reportlab pikepdf python-dotenv pillow"
             
             messagebox.showerror("Dépendances manquantes", error_message)
             return False
@@ -633,46 +858,31 @@ class PDFGeneratorGUI:
     def generate_pdf_thread(self):
         """Run PDF generation by calling the script as subprocess"""
         try:
-            self.log_queue.put(('progress', 5, "Préparation de l'environnement"))
-            self.log_queue.put(('log', "🚀 Starting PDF generation process...\n"))
+            self.post_message(('progress', 5, "Préparation de l'environnement"))
+            self.post_message(('log', "🚀 Starting PDF generation process...\n"))
             print("🚀 Starting PDF generation from GUI...")  # Console log
             
             # Run the script as subprocess to avoid import issues
-            import subprocess
-            import sys
-            
-            # Get Python executable path (use current Python interpreter)
-            import sys
-            python_exe = sys.executable
-            
-            # Si on détecte qu'on est dans un venv, utilisons l'exécutable du venv
-            if hasattr(sys, 'real_prefix') or (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix):
-                # Nous sommes dans un environnement virtuel
-                print(f"📦 Virtual environment detected: {python_exe}")
-            else:
-                # Essayer de trouver le venv local
-                venv_python = os.path.join(os.getcwd(), ".venv", "Scripts", "python.exe")
-                if os.path.exists(venv_python):
-                    python_exe = venv_python
-                    print(f"📦 Using local virtual environment: {python_exe}")
-                else:
-                    print(f"🐍 Using system Python: {python_exe}")
-                    print("⚠️  Warning: Make sure all dependencies are installed in system Python")
-                
-            script_path = "pass-schedule-pdf.py"
+            python_exe = self._python_exe
+            script_path = self._script_path
             
             # Check if script exists
             if not os.path.exists(script_path):
-                self.log_queue.put(('log', f"❌ Script not found: {script_path}\n"))
+                self.post_message(('log', f"❌ Script not found: {script_path}\n"))
                 return
             
-            self.log_queue.put(('progress', 15, "Lancement du script"))
+            self.post_message(('progress', 15, "Lancement du script"))
             print(f"📄 Executing: {python_exe} {script_path}")  # Console log
             
-            # Prepare environment with UTF-8 encoding for emojis
+            # Prepare environment with UTF-8 encoding for emojis, once the
+            # background .env loading has filled os.environ
+            self._env_ready.wait()
             env = os.environ.copy()
             env['PYTHONIOENCODING'] = 'utf-8'
             env['PYTHONLEGACYWINDOWSSTDIO'] = '0'  # Force UTF-8 on Windows
+            env['PYTHONUNBUFFERED'] = '1'  # Deliver each log line as soon as it is printed
+            # Let the script reuse (and refresh) the bytecode cache of its dependencies
+            env.pop('PYTHONDONTWRITEBYTECODE', None)
             
             # Override all settings with GUI values
             env['IMT_USERNAME'] = self.username_var.get()
@@ -680,153 +890,160 @@ class PDFGeneratorGUI:
             env['NOM_PRENOM'] = self.nom_prenom_var.get()
             env['PROMO'] = self.promo_var.get()
             env['TARGET_WEEK'] = self.target_week_var.get()
+            # A TARGET_WEEKS list from .env would take precedence over the selected week
+            env['TARGET_WEEKS'] = ''
             env['PDF_MESSAGE'] = self.pdf_message_var.get()
             env['SIGNATURE_FILE'] = self.signature_file_var.get()
             # Keep DEBUG_MODE from .env or default to false
             env['DEBUG_MODE'] = os.getenv('DEBUG_MODE', 'false')
             
-            # Start the subprocess with separate stdout/stderr
+            # Start the subprocess with stderr merged into stdout so a single
+            # reader keeps the original ordering of the lines
             process = subprocess.Popen(
                 [python_exe, script_path],
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
                 encoding='utf-8',
                 errors='replace',  # Replace problematic characters instead of crashing
-                cwd=os.getcwd(),
+                bufsize=1,  # Line buffered
+                cwd=self._cwd,
                 env=env
             )
             
-            # Read output line by line from both stdout and stderr
-            def read_stdout():
-                while True:
-                    line = process.stdout.readline()
-                    if line == '' and process.poll() is not None:
-                        break
-                    if line:
-                        self.log_queue.put(('log', f"[STDOUT] {line}"))
-                        print(f"[STDOUT] {line.rstrip()}")
-                        # Détecter les étapes dans les logs
-                        self.detect_step_from_log(line)
-            
-            def read_stderr():
-                while True:
-                    line = process.stderr.readline()
-                    if line == '' and process.poll() is not None:
-                        break
-                    if line:
-                        self.log_queue.put(('log', f"[STDERR] {line}"))
-                        print(f"[STDERR] {line.rstrip()}")
-                        # Détecter les étapes dans les logs d'erreur aussi
-                        self.detect_step_from_log(line)
-            
-            # Start threads to read both streams
-            stdout_thread = threading.Thread(target=read_stdout, daemon=True)
-            stderr_thread = threading.Thread(target=read_stderr, daemon=True)
-            stdout_thread.start()
-            stderr_thread.start()
+            # Read output line by line (this already runs in a background thread)
+            for line in iter(process.stdout.readline, ''):
+                self.post_message(('log', f"[SCRIPT] {line}"))
+                print(f"[SCRIPT] {line.rstrip()}")
+                # Détecter les étapes dans les logs
+                self.detect_step_from_log(line)
             
             # Wait for process to complete
             return_code = process.wait()
             
-            # Wait a bit for threads to finish reading
-            stdout_thread.join(timeout=1)
-            stderr_thread.join(timeout=1)
-            
             if return_code == 0:
-                self.log_queue.put(('progress', 100, "Génération terminée avec succès"))
-                self.log_queue.put(('log', "Tâche terminée, vérifiez les logs pour plus de détails.\n"))
+                self.post_message(('progress', 100, "Génération terminée avec succès"))
+                self.post_message(('log', "Tâche terminée, vérifiez les logs pour plus de détails.\n"))
                 print("✅ PDF generation completed successfully!")  # Console log
             else:
-                self.log_queue.put(('progress', 0, "Échec de la génération"))
-                self.log_queue.put(('log', "❌ Génération PDF échouée - vérifiez les logs\n"))
+                self.post_message(('progress', 0, "Échec de la génération"))
+                self.post_message(('log', "❌ Génération PDF échouée - vérifiez les logs\n"))
                 print(f"❌ PDF generation failed with return code: {return_code}")  # Console log
                 
         except Exception as e:
-            self.log_queue.put(('log', f"❌ Error during generation: {e}\n"))
-            self.log_queue.put(('progress', 0, "Erreur lors de la génération"))
+            self.post_message(('log', f"❌ Error during generation: {e}\n"))
+            self.post_message(('progress', 0, "Erreur lors de la génération"))
         finally:
             # Re-enable button
-            self.log_queue.put(('button_enable', None))
+            self.post_message(('button_enable', None))
             self.is_running = False
     
     def detect_step_from_log(self, log_line):
         """Detect current step from log output and update progress"""
-        log_lower = log_line.lower()
-        
-        # Définir les étapes et leurs patterns
-        step_patterns = [
-            ("starting schedule pdf generation", 20, "Démarrage du processus"),
-            ("configuration validated", 25, "Configuration validée"),
-            ("chrome browser started", 30, "Navigateur lancé"),
-            ("connecting to pass", 35, "Connexion à PASS"),
-            ("login successful", 45, "Connexion réussie"),
-            ("navigating to schedule", 50, "Accès à l'emploi du temps"),
-            ("navigation successful", 60, "Navigation terminée"),
-            ("generating pdf", 70, "Génération du PDF en cours"),
-            ("pdf generated successfully", 85, "PDF généré avec succès"),
-            ("pdf de l'emploi du temps généré avec succès", 95, "Génération terminée"),
-            ("schedule pdf generation completed", 100, "Processus terminé")
-        ]
+        # Fast path: most lines cannot be a step message
+        if not log_line.startswith(STEP_LINE_PREFIXES):
+            return
         
-        for pattern, progress, step_text in step_patterns:
-            if pattern in log_lower:
-                self.log_queue.put(('progress', progress, step_text))
-                break
+        # Single case-insensitive anchored match for all patterns, limited to
+        # the start of the line so huge lines (stack traces, HTML dumps) stay cheap
+        match = STEP_RE.match(log_line, 0, STEP_SCAN_LENGTH)
+        if match:
+            progress, step_text = STEP_TABLE[match.group(1).lower()]
+            self.post_message(('progress', progress, step_text))
             
     def clear_logs(self):
         """Clear the log text area"""
         self.log_text.delete(1.0, tk.END)
+        self._log_line_count = 0
         self.log_message("🗑️ Logs cleared")
         
+    def get_save_folder(self):
+        """Return the absolute output folder, created on first use"""
+        if self._save_folder is None:
+            self._env_ready.wait()
+            save_folder = os.path.abspath(os.getenv('SAVE_FOLDER', 'pdfs'))
+            os.makedirs(save_folder, exist_ok=True)
+            self._save_folder = save_folder
+        return self._save_folder
+    
     def open_output_folder(self):
         """Open the output folder in file explorer"""
-        save_folder = os.getenv('SAVE_FOLDER', 'pdfs')
-        folder_path = os.path.abspath(save_folder)
+        try:
+            folder_path = self.get_save_folder()
+        except OSError as e:
+            self.log_message(f"⚠️ Could not create folder: {e}")
+            return
         
-        if os.path.exists(folder_path):
-            # Open folder in Windows Explorer
-            if os.name == 'nt':  # Windows
-                os.startfile(folder_path)
-            else:
-                # For other OS
-                subprocess.run(['xdg-open' if os.name == 'posix' else 'open', folder_path])
-            self.log_message(f"📁 Opened folder: {folder_path}")
-        else:
-            self.log_message(f"⚠️ Folder does not exist: {folder_path}")
+        try:
+            self._open_folder(folder_path)
+        except OSError as e:
+            self.log_message(f"⚠️ Could not open folder: {e}")
+            return
+        self.log_message(f"📁 Opened folder: {folder_path}")
             
+    def post_message(self, item):
+        """Queue a message for the UI thread and wake it up (callable from any thread)"""
+        self.log_queue.append(item)
+        if not self._wakeup_pending:
+            # One wakeup per batch, process_queue drains everything queued meanwhile
+            self._wakeup_pending = True
+            try:
+                self.root.event_generate("<<LogMsg>>", when="tail")
+            except (RuntimeError, tk.TclError):
+                # Main loop not running (yet): poll_queue will pick it up
+                pass
+    
+    def poll_queue(self):
+        """Safety net in case a wakeup event could not be delivered"""
+        # Rescheduled first so an error while processing does not stop polling
+        self.root.after(250, self.poll_queue)
+        self.process_queue()
+    
     def process_queue(self):
         """Process messages from the background thread"""
-        try:
-            while True:
-                try:
-                    item = self.log_queue.get_nowait()
-                    
-                    if item[0] == 'log':
-                        # Add to log area
-                        self.log_text.insert(tk.END, item[1])
-                        self.log_text.see(tk.END)
-                        
-                    elif item[0] == 'progress':
-                        # Update progress bar and step
-                        if len(item) >= 3:
-                            # Format: ('progress', value, step)
-                            self.update_progress(item[1], item[2])
-                        else:
-                            # Format: ('progress', value)
-                            self.update_progress(item[1])
-                            
-                    elif item[0] == 'button_enable':
-                        self.start_button.config(state="normal", text="Générer PDF")
-                        
-                except queue.Empty:
-                    break
-                    
-        except Exception as e:
-            print(f"Error processing queue: {e}")
+        # Cleared before draining so messages queued during the drain post a new wakeup
+        self._wakeup_pending = False
+        log_chunks = []
+        pending_progress = None
+        while self.log_queue:
+            item = self.log_queue.popleft()
             
-        # Schedule next check
-        self.root.after(100, self.process_queue)
+            if item[0] == 'log':
+                # Collected and inserted in one go after draining
+                log_chunks.append(item[1])
+                
+            elif item[0] == 'progress':
+                # Only the latest progress update of this pass is shown
+                pending_progress = item
+                
+            elif item[0] == 'button_enable':
+                self.start_button.config(state="normal", text="Générer PDF")
+        
+        # Add all pending lines to the log area with a single redraw
+        if log_chunks:
+            # Only follow new output if the user has not scrolled up to read history
+            autoscroll = self.log_text.yview()[1] >= 1.0
+            text = "".join(log_chunks)
+            self.log_text.insert(tk.END, text)
+            
+            # Drop the oldest lines once the cap is exceeded
+            self._log_line_count += text.count("\n")
+            excess = self._log_line_count - self.max_log_lines
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+                self._log_line_count = self.max_log_lines
+            
+            if autoscroll:
+                self.log_text.yview_moveto(1.0)
+        
+        # Update progress bar and step
+        if pending_progress is not None:
+            if len(pending_progress) >= 3:
+                # Format: ('progress', value, step)
+                self.update_progress(pending_progress[1], pending_progress[2])
+            else:
+                # Format: ('progress', value)
+                self.update_progress(pending_progress[1])
 
 
 def main():
@@ -839,17 +1056,9 @@ def main():
         style = ttk.Style()
         style.theme_use('vista' if 'vista' in style.theme_names() else 'clam')
         
-        # Create application
+        # Create application (the window is centered on screen by the constructor)
         app = PDFGeneratorGUI(root)
         
-        # Center window on screen
-        root.update_idletasks()
-        width = root.winfo_width()
-        height = root.winfo_height()
-        x = (root.winfo_screenwidth() // 2) - (width // 2)
-        y = (root.winfo_screenheight() // 2) - (height // 2)
-        root.geometry(f"{width}x{height}+{x}+{y}")
-        
         # Run the application
         root.mainloop()
         
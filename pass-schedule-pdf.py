@@ -10,31 +10,22 @@ import time
 import base64
 import shutil
 import io
-
-# Sauvegarder la fonction print originale AVANT de la redéfinir
-_original_print = print
-
-def safe_print(message):
-    """Print function that handles Unicode properly on all platforms"""
-    try:
-        _original_print(message)
-        sys.stdout.flush()  # Force flush for subprocess
-    except UnicodeEncodeError:
-        # Fallback: encoder en UTF-8 puis décoder en cp1252 avec ignore
-        try:
-            encoded = message.encode('utf-8', errors='replace').decode('utf-8')
-            _original_print(encoded)
-            sys.stdout.flush()
-        except:
-            # Dernier recours : remplacer les emojis problématiques
-            safe_message = message.replace('📅', '[DATE]').replace('⚠️', '[WARNING]').replace('→', '->')
-            _original_print(safe_message)
-            sys.stdout.flush()
+import json
+import functools
+import traceback
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 
-# Remplacer print par safe_print globalement
-print = safe_print
+# Une sortie UTF-8 : les emojis passent sur les consoles Windows. La mise en tampon
+# reste celle de Python: ligne par ligne sur un terminal, par blocs vers un fichier
+# ou un pipe (cron, conteneur). La GUI lance le script avec PYTHONUNBUFFERED=1
+# pour recevoir chaque message dès qu'il est écrit.
+for _stream in (sys.stdout, sys.stderr):
+    try:
+        _stream.reconfigure(encoding='utf-8', errors='replace')
+    except (AttributeError, ValueError):
+        pass
 
 # Third-party imports
 from selenium import webdriver
@@ -46,9 +37,18 @@ from selenium.common.exceptions import TimeoutException, WebDriverException, NoS
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.colors import blue
-from PyPDF2 import PdfReader, PdfWriter
+from reportlab.lib.utils import ImageReader
+import pikepdf
 from dotenv import load_dotenv
 
+# Décodeur base64 SIMD si disponible, sinon le module standard (même API).
+# Le chemin rapide de pybase64 est validate=True (CDP renvoie du base64 propre);
+# validate=False filtre d'abord les caractères hors alphabet, ce qui est plus lent.
+try:
+    import pybase64 as b64
+except ImportError:
+    b64 = base64
+
 # Load environment variables
 load_dotenv()
 
@@ -72,15 +72,59 @@ class BrowserNavigationError(Exception):
 DEFAULT_TIMEOUT = 30
 PDF_GENERATION_TIMEOUT = 15
 PAGE_LOAD_TIMEOUT = 10
+AGENDA_REDRAW_TIMEOUT = 3  # NavDat peut redessiner une semaine identique: pas de changement visible
+WAIT_POLL_INTERVAL = 0.1  # Selenium vérifie par défaut ses conditions toutes les 0.5s
 SIGNATURE_WIDTH = 80
 SIGNATURE_HEIGHT = 40
 TEXT_MARGIN = 30
+SESSION_FILE = '.pass_session.json'
+CDP_READ_CHUNK_SIZE = 512 * 1024
+PDF_WRITE_BUFFER_SIZE = 1 << 20
+MIN_DEV_SHM_SIZE = 256 * 1024 * 1024
+
+
+def resolve_signature_path():
+    """Chemin absolu de l'image de signature configurée par SIGNATURE_FILE"""
+    return os.path.abspath(os.getenv('SIGNATURE_FILE', 'signature.png'))
+
+
+# Résolu une fois par processus (le .env est déjà chargé ci-dessus)
+SIGNATURE_PATH = resolve_signature_path()
+
+# Messages de diagnostic détaillés, activés par DEBUG_MODE (voir __main__)
+VERBOSE = False
+
+
+def dprint(*args, **kwargs):
+    """print() réservé aux détails de diagnostic, affiché seulement en mode verbeux"""
+    if VERBOSE:
+        print(*args, **kwargs)
+
+
+# CSS appliqué à la page de l'agenda avant Page.printToPDF
+PRINT_CSS = """
+    @media print {
+        body { margin: 0; padding: 5px; font-size: 12px; }
+        * { -webkit-print-color-adjust: exact !important; }
+        .no-print, .noprint { display: none !important; }
+        table { 
+            page-break-inside: avoid; 
+            border-collapse: collapse;
+            width: 100% !important;
+        }
+    }
+    @page { 
+        size: A4 landscape; 
+        margin: 0.5cm; 
+    }
+"""
 
 
 class DateUtils:
     """Utilitaires pour la gestion des dates et semaines."""
     
     @staticmethod
+    @functools.lru_cache(maxsize=256)
     def get_monday_from_week_number(year: int, week_number: int) -> str:
         """Calcule la date du lundi d'une semaine donnée (format ISO)."""
         try:
@@ -93,6 +137,7 @@ class DateUtils:
             return datetime.now().strftime("%Y%m%d")
     
     @staticmethod
+    @functools.lru_cache(maxsize=256)
     def get_week_number_from_date(date_str: str) -> str:
         """Calcule le numéro de semaine (S37) à partir d'une date YYYYMMDD."""
         try:
@@ -137,19 +182,37 @@ class DateUtils:
         current_date = datetime.now().strftime("%Y%m%d")
         print(f"📅 Using current date: {current_date}")
         return current_date
+    
+    @staticmethod
+    def get_target_dates() -> list:
+        """Détermine les dates cibles: TARGET_WEEKS (ex: '38,39,40') ou la date unique habituelle."""
+        target_weeks = os.getenv('TARGET_WEEKS')
+        
+        if target_weeks:
+            current_year = datetime.now().year
+            dates = []
+            for week in target_weeks.split(','):
+                try:
+                    dates.append(DateUtils.get_monday_from_week_number(current_year, int(week)))
+                except ValueError:
+                    print(f"⚠️ Invalid week in TARGET_WEEKS: {week!r}")
+            if dates:
+                print(f"📅 Using TARGET_WEEKS={target_weeks} → {', '.join(dates)}")
+                return dates
+        
+        return [DateUtils.get_target_date()]
 
 
 class FileUtils:
     """Utilitaires pour la gestion des fichiers."""
     
+    # Caractères interdits dans un nom de fichier Windows, remplacés par '-'
+    _WINDOWS_FORBIDDEN = str.maketrans({char: '-' for char in '<>:"|?*\\/'})
+    
     @staticmethod
     def clean_filename_for_windows(filename: str) -> str:
         """Nettoie un nom de fichier pour Windows."""
-        forbidden_chars = '<>:"|?*\\/'
-        cleaned = filename
-        for char in forbidden_chars:
-            cleaned = cleaned.replace(char, '-')
-        return cleaned.strip()
+        return filename.translate(FileUtils._WINDOWS_FORBIDDEN).strip()
     
     @staticmethod
     def create_pdf_filename(target_date: str = None) -> str:
@@ -171,24 +234,31 @@ class FileUtils:
         Path(directory).mkdir(parents=True, exist_ok=True)
     
     @staticmethod
-    def safe_rename_pdf(temp_path: str, target_filename: str, save_folder: str) -> str:
-        """Renomme le PDF de manière sécurisée."""
+    def write_file_atomically(path: Path, data: bytes) -> None:
+        """Écrit dans un fichier .tmp voisin puis le renomme: jamais de PDF à moitié écrit."""
+        tmp_path = path.with_suffix('.pdf.tmp')
+        try:
+            with open(tmp_path, 'wb', buffering=PDF_WRITE_BUFFER_SIZE) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+    
+    @staticmethod
+    def safe_write_pdf(pdf_data: bytes, target_filename: str, save_folder: str) -> str:
+        """Écrit le PDF sous son nom final, ou sous un nom de repli si celui-ci est refusé."""
+        final_path = Path(save_folder) / target_filename
         try:
-            final_path = Path(save_folder) / target_filename
-            shutil.move(temp_path, final_path)
-            print(f"✅ PDF renamed to: {target_filename}")
+            FileUtils.write_file_atomically(final_path, pdf_data)
             return str(final_path)
-        except Exception as e:
-            print(f"⚠️ Could not rename to '{target_filename}': {e}")
+        except OSError as e:
+            print(f"⚠️ Could not write '{target_filename}': {e}")
             fallback_name = target_filename.replace("–", "-").replace(" ", "_")
-            try:
-                fallback_path = Path(save_folder) / fallback_name
-                shutil.move(temp_path, fallback_path)
-                print(f"✅ PDF saved with fallback name: {fallback_name}")
-                return str(fallback_path)
-            except Exception as e2:
-                print(f"❌ Rename failed: {e2}")
-                return temp_path
+            fallback_path = Path(save_folder) / fallback_name
+            FileUtils.write_file_atomically(fallback_path, pdf_data)
+            print(f"✅ PDF saved with fallback name: {fallback_name}")
+            return str(fallback_path)
 
 
 def get_week_date(weeks_offset=0):
@@ -204,136 +274,146 @@ def get_week_date(weeks_offset=0):
     return target_date.strftime("%Y%m%d")
 
 
-def add_message_to_pdf(input_pdf_path, output_pdf_path, message):
-    """Ajoute un message personnalisé et une signature sur le PDF avec gestion d'erreurs robuste"""
+# Images de signature décodées, indexées par (chemin, date de modification)
+_signature_cache = {}
+
+
+def get_signature_reader(signature_path):
+    """Retourne l'image de signature décodée, réutilisée tant que le fichier ne change pas"""
+    key = (signature_path, os.path.getmtime(signature_path))
+    reader = _signature_cache.get(key)
+    if reader is None:
+        reader = ImageReader(signature_path)
+        _signature_cache[key] = reader
+    return reader
+
+
+# Overlays déjà rendus, indexés par message, taille de page et signature (chemin, date)
+_overlay_cache = {}
+
+
+def render_overlay_pdf(message, page_width, page_height):
+    """Dessine le message et la signature sur une page PDF transparente et la retourne en bytes"""
+    packet = io.BytesIO()
+    
+    # Créer un canvas pour le texte overlay
+    can = canvas.Canvas(packet, pagesize=(page_width, page_height))
+    
+    # Configuration du texte - position en bas à gauche
+    can.setFont("Helvetica-Bold", 12)
+    can.setFillColor(blue)
+    
+    # Positionner le message en bas à gauche (avec marge de sécurité)
+    text_x = 30  # 30 points du bord gauche
+    text_y = 30  # 30 points du bas
+    
+    dprint(f"📝 Adding text at position: x={text_x}, y={text_y}")
+    can.drawString(text_x, text_y, message)
+    
+    # Ajouter la signature en bas à droite
+    signature_path = SIGNATURE_PATH
+    
+    try:
+        # Lit la date de modification: échoue si le fichier n'existe pas
+        signature_reader = get_signature_reader(signature_path)
+    except OSError:
+        signature_reader = None
+    
+    if signature_reader is not None:
+        try:
+            print(f"📝 Adding signature from: {signature_path}")
+            
+            # Position en bas à droite (avec marges de sécurité)
+            sig_x = page_width - SIGNATURE_WIDTH - TEXT_MARGIN
+            sig_y = TEXT_MARGIN
+            
+            dprint(f"🖼️ Adding signature at position: x={sig_x}, y={sig_y}, w={SIGNATURE_WIDTH}, h={SIGNATURE_HEIGHT}")
+            
+            # Ajouter l'image de signature (décodée une seule fois par processus)
+            can.drawImage(signature_reader, sig_x, sig_y, 
+                        width=SIGNATURE_WIDTH, height=SIGNATURE_HEIGHT, 
+                        mask='auto')  # Support de la transparence
+            print("✅ Signature added successfully")
+        except Exception as sig_error:
+            print(f"⚠️ Warning: Could not add signature: {sig_error}")
+            # Continue sans signature plutôt que d'échouer complètement
+    else:
+        print(f"⚠️ Signature file not found or not configured: {signature_path}")
+    
+    can.save()
+    return packet.getvalue()
+
+
+def get_overlay_pdf(message, page_width, page_height):
+    """Retourne l'overlay du message et de la signature, rendu une seule fois par configuration"""
+    try:
+        signature_mtime = os.path.getmtime(SIGNATURE_PATH)
+    except OSError:
+        signature_mtime = None
+    key = (message, page_width, page_height, SIGNATURE_PATH, signature_mtime)
+    overlay = _overlay_cache.get(key)
+    if overlay is None:
+        overlay = render_overlay_pdf(message, page_width, page_height)
+        _overlay_cache[key] = overlay
+    else:
+        dprint("♻️ Reusing cached message/signature overlay")
+    return overlay
+
+
+def add_message_to_pdf_bytes(pdf_source, message):
+    """Ajoute le message et la signature à un PDF (chemin ou flux binaire) et retourne le PDF signé en bytes"""
     try:
         print(f"✏️ Adding custom message and signature to PDF: '{message}'")
         
-        # Validation des paramètres d'entrée
-        if not input_pdf_path or not os.path.exists(input_pdf_path):
-            raise PDFProcessingError(f"Input PDF file not found: {input_pdf_path}")
-        
         if not message or not message.strip():
             raise PDFProcessingError("Message cannot be empty")
         
-        # Lire le PDF original
+        # Lire le PDF original (pikepdf/qpdf, la fusion se fait en C++)
         try:
-            reader = PdfReader(input_pdf_path)
+            pdf = pikepdf.open(pdf_source)
         except Exception as e:
             raise PDFProcessingError(f"Failed to read input PDF: {e}")
         
-        if len(reader.pages) == 0:
-            raise PDFProcessingError("Input PDF has no pages")
-        
-        writer = PdfWriter()
-        
-        # Traiter chaque page (normalement juste la première)
-        for page_num, page in enumerate(reader.pages):
+        with pdf:
+            if len(pdf.pages) == 0:
+                raise PDFProcessingError("Input PDF has no pages")
+            
+            # Le PDF est imprimé avec pageRanges='1' : une seule page à traiter
+            page = pdf.pages[0]
+            
+            # Obtenir les dimensions de la page
+            mediabox = page.mediabox
+            page_width = float(mediabox[2]) - float(mediabox[0])
+            page_height = float(mediabox[3]) - float(mediabox[1])
+            
+            dprint(f"🔍 Page dimensions: width={page_width}, height={page_height}")
+            
+            # Overlay avec le message et la signature (rendu une fois par configuration)
+            overlay = get_overlay_pdf(message, page_width, page_height)
+            
+            # Ajouter l'overlay au flux de contenu de la page originale
             try:
-                # Créer un overlay avec le message et la signature
-                packet = io.BytesIO()
-                
-                # Obtenir les dimensions de la page
-                page_width = float(page.mediabox.width)
-                page_height = float(page.mediabox.height)
-                
-                print(f"🔍 Page {page_num + 1} dimensions: width={page_width}, height={page_height}")
-                
-                # Créer un canvas pour le texte overlay
-                can = canvas.Canvas(packet, pagesize=(page_width, page_height))
-                
-                # Configuration du texte - position en bas à gauche
-                can.setFont("Helvetica-Bold", 12)
-                can.setFillColor(blue)
-                
-                # Positionner le message en bas à gauche (avec marge de sécurité)
-                text_x = 30  # 30 points du bord gauche
-                text_y = 30  # 30 points du bas
-                
-                print(f"📝 Adding text at position: x={text_x}, y={text_y}")
-                can.drawString(text_x, text_y, message)
-                
-                # Ajouter la signature en bas à droite
-                signature_file = os.getenv('SIGNATURE_FILE', 'signature.png')
-                signature_path = os.path.abspath(signature_file)
-                
-                if signature_file and os.path.exists(signature_path):
-                    try:
-                        print(f"📝 Adding signature from: {signature_path}")
-                        
-                        # Dimensions de la signature (plus petites pour être sûr)
-                        signature_width = 80  # largeur en points
-                        signature_height = 40  # hauteur en points
-                        
-                        # Position en bas à droite (avec marges de sécurité)
-                        sig_x = page_width - signature_width - 30  # 30 points du bord droit
-                        sig_y = 30  # 30 points du bas
-                        
-                        print(f"🖼️ Adding signature at position: x={sig_x}, y={sig_y}, w={signature_width}, h={signature_height}")
-                        
-                        # Ajouter l'image de signature
-                        can.drawImage(signature_path, sig_x, sig_y, 
-                                    width=signature_width, height=signature_height, 
-                                    mask='auto')  # Support de la transparence
-                        print("✅ Signature added successfully")
-                    except Exception as sig_error:
-                        print(f"⚠️ Warning: Could not add signature: {sig_error}")
-                        # Continue sans signature plutôt que d'échouer complètement
-                else:
-                    print(f"⚠️ Signature file not found or not configured: {signature_path}")
-                
-                can.save()
-                
-                # Revenir au début du buffer
-                packet.seek(0)
-                
-                # Créer un nouveau PDF à partir du buffer
-                try:
-                    overlay_pdf = PdfReader(packet)
-                    # Fusionner avec la page originale
-                    page.merge_page(overlay_pdf.pages[0])
-                except Exception as merge_error:
-                    print(f"⚠️ Warning: Could not merge overlay on page {page_num + 1}: {merge_error}")
-                    # Ajouter la page originale sans overlay
-                
-                writer.add_page(page)
-                
-            except Exception as page_error:
-                print(f"⚠️ Warning: Error processing page {page_num + 1}: {page_error}")
-                # Ajouter la page originale en cas d'erreur
-                writer.add_page(page)
-        
-        # Sauvegarder le PDF modifié
-        try:
-            # S'assurer que le dossier de destination existe
-            output_dir = os.path.dirname(output_pdf_path)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+                with pikepdf.open(io.BytesIO(overlay)) as overlay_pdf:
+                    page.add_overlay(overlay_pdf.pages[0])
+            except Exception as merge_error:
+                print(f"⚠️ Warning: Could not merge overlay on page: {merge_error}")
+                # Garder la page originale sans overlay
             
-            with open(output_pdf_path, 'wb') as output_file:
-                writer.write(output_file)
-        except Exception as save_error:
-            raise PDFProcessingError(f"Failed to save output PDF: {save_error}")
+            # Sérialiser le PDF modifié en mémoire
+            try:
+                output_buffer = io.BytesIO()
+                pdf.save(output_buffer, linearize=False, compress_streams=True)
+            except Exception as save_error:
+                raise PDFProcessingError(f"Failed to save output PDF: {save_error}")
         
-        print(f"✅ PDF with custom message and signature saved to: {output_pdf_path}")
-        return True
+        return output_buffer.getvalue()
         
     except PDFProcessingError:
         # Re-raise les erreurs PDF spécifiques
         raise
     except Exception as e:
         print(f"❌ Unexpected error adding message/signature to PDF: {e}")
-        import traceback
         traceback.print_exc()
-        
-        # En cas d'erreur, essayer de copier le fichier original
-        try:
-            if os.path.exists(input_pdf_path):
-                shutil.copy2(input_pdf_path, output_pdf_path)
-                print(f"📋 Copied original PDF to output location as fallback")
-        except Exception as copy_error:
-            print(f"❌ Failed to copy original PDF as fallback: {copy_error}")
-            
         raise PDFProcessingError(f"Failed to process PDF: {e}")
 
 
@@ -353,16 +433,12 @@ def login(driver, wait, username, password):
         except Exception as e:
             raise BrowserNavigationError(f"Failed to navigate to PASS: {e}")
         
-        # Attendre que la page soit complètement chargée
-        time.sleep(2)
-        
         # Cliquer sur le bouton SSO
         try:
             print("🔍 Looking for SSO button...")
             sso_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[span[text()='SSO']]")))
             sso_button.click()
             print("✅ SSO button clicked")
-            time.sleep(3)  # Attendre la redirection
         except TimeoutException:
             raise BrowserNavigationError("SSO button not found or not clickable")
         except Exception as e:
@@ -403,7 +479,6 @@ def login(driver, wait, username, password):
             submit_button = wait.until(EC.element_to_be_clickable((By.CLASS_NAME, 'btn-submit')))
             submit_button.click()
             print("✅ Login form submitted")
-            time.sleep(4)  # Attendre la validation
         except TimeoutException:
             raise BrowserNavigationError("Submit button not found or not clickable")
         except Exception as e:
@@ -415,7 +490,6 @@ def login(driver, wait, username, password):
             confirm_button = wait.until(EC.element_to_be_clickable((By.NAME, '_eventId_proceed')))
             confirm_button.click()
             print("✅ Login confirmed")
-            time.sleep(3)  # Attendre la redirection finale
         except TimeoutException:
             raise BrowserNavigationError("Confirmation button not found or not clickable")
         except Exception as e:
@@ -424,6 +498,7 @@ def login(driver, wait, username, password):
         # Vérifier que la connexion a réussi
         try:
             # Attendre d'être redirigé vers la page principale
+            wait.until(EC.url_contains('pass.imt-atlantique.fr'))
             current_url = driver.current_url
             if "pass.imt-atlantique.fr" not in current_url:
                 raise BrowserNavigationError(f"Unexpected redirect after login: {current_url}")
@@ -439,20 +514,78 @@ def login(driver, wait, username, password):
         raise BrowserNavigationError(f"Unexpected error during login: {e}")
 
 
-def navigate_to_schedule(driver, wait):
-    """Navigue vers l'emploi du temps dans PASS avec gestion d'erreurs robuste"""
+def save_session_cookies(driver, username, session_file=SESSION_FILE):
+    """Sauvegarde les cookies de session PASS (et le compte associé) pour éviter le SSO au prochain lancement"""
     try:
-        print("Navigating to schedule...")
+        # Les cookies donnent accès au compte: fichier lisible par l'utilisateur seulement
+        fd = os.open(session_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, 0o600)  # Le mode d'os.open ne s'applique pas à un fichier existant
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'username': username, 'cookies': driver.get_cookies()}, f)
+        print("✅ Session cookies saved")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not save session cookies: {e}")
+
+
+def restore_session(driver, username, session_file=SESSION_FILE):
+    """Réinjecte les cookies sauvegardés; retourne True si la session PASS est encore valide"""
+    try:
+        with open(session_file, 'r', encoding='utf-8') as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return False
+    
+    # Ne jamais réutiliser la session d'un autre compte (ni l'ancien format sans compte)
+    if not isinstance(session, dict) or session.get('username') != username:
+        print("⚠️ Saved session belongs to another account, logging in again")
+        try:
+            os.remove(session_file)
+        except OSError:
+            pass
+        return False
+    cookies = session.get('cookies', [])
+    
+    try:
+        print("🍪 Restoring saved PASS session...")
+        # Les cookies ne peuvent être ajoutés que depuis le domaine concerné
+        driver.get('https://pass.imt-atlantique.fr')
+        for cookie in cookies:
+            try:
+                driver.add_cookie(cookie)
+            except WebDriverException:
+                continue
         
-        # Attendre un peu avant de naviguer
-        time.sleep(0.5)
+        # La page d'accueil avec le frame 'content' n'est servie qu'à une session authentifiée
+        driver.get('https://pass.imt-atlantique.fr/OpDotNet/Noyau/Default.aspx?')
+        WebDriverWait(driver, PAGE_LOAD_TIMEOUT, poll_frequency=WAIT_POLL_INTERVAL).until(
+            EC.presence_of_element_located((By.NAME, 'content')))
+        print("✅ Saved session still valid, skipping SSO login")
+        return True
+    except TimeoutException:
+        print("⚠️ Saved session expired, logging in again")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not restore session: {e}")
+    
+    driver.delete_all_cookies()
+    return False
+
+
+def navigate_to_schedule(driver, wait, reload=True):
+    """Navigue vers l'emploi du temps dans PASS avec gestion d'erreurs robuste
+    
+    reload=False quand la page d'accueil vient déjà d'être chargée (session restaurée).
+    """
+    try:
+        print("Navigating to schedule...")
         
         # Naviguer directement vers la page d'emploi du temps
-        try:
-            driver.get('https://pass.imt-atlantique.fr/OpDotNet/Noyau/Default.aspx?')
-            print("✅ Successfully navigated to schedule page")
-        except Exception as e:
-            raise BrowserNavigationError(f"Failed to navigate to schedule page: {e}")
+        if reload:
+            try:
+                driver.get('https://pass.imt-atlantique.fr/OpDotNet/Noyau/Default.aspx?')
+                print("✅ Successfully navigated to schedule page")
+            except Exception as e:
+                raise BrowserNavigationError(f"Failed to navigate to schedule page: {e}")
         
         # Attendre que la page soit complètement chargée
         try:
@@ -473,41 +606,30 @@ def navigate_to_schedule(driver, wait):
         except Exception as e:
             print(f"⚠️ Error checking jQuery: {e}")
         
-        # Attendre un peu plus pour que tous les éléments soient chargés
-        time.sleep(2)
-        
-        print("🔍 Debug: Checking frames structure...")
+        dprint("🔍 Debug: Checking frames structure...")
         try:
-            # Lister tous les frames disponibles
-            frames = driver.find_elements(By.TAG_NAME, "frame")
-            print(f"Found {len(frames)} frames:")
+            # Lister tous les frames disponibles (noms et URLs en un seul aller-retour)
+            frames = driver.execute_script(
+                "return Array.from(document.getElementsByTagName('frame'), f => [f.name, f.src]);")
+            print(f"Found {len(frames)} frames")
             
-            for i, frame in enumerate(frames):
-                try:
-                    name = frame.get_attribute("name") or "unnamed"
-                    src = frame.get_attribute("src") or "no-src"
-                    print(f"  Frame {i+1}: name='{name}' src='{src}'")
-                except Exception as frame_error:
-                    print(f"  Frame {i+1}: Error reading attributes: {frame_error}")
+            for i, (name, src) in enumerate(frames):
+                dprint(f"  Frame {i+1}: name='{name or 'unnamed'}' src='{src or 'no-src'}'")
             
             # Chercher le frame content qui contient l'emploi du temps
-            content_frame = None
-            for frame in frames:
-                try:
-                    if frame.get_attribute("name") == "content":
-                        content_frame = frame
-                        break
-                except Exception as e:
-                    print(f"⚠️ Warning: Error checking frame name: {e}")
-                    continue
-            
-            if content_frame:
+            if any(name == "content" for name, _ in frames):
                 try:
                     print("✅ Found 'content' frame, switching to it...")
                     driver.switch_to.frame("content")
-                    # Attendre que le contenu du frame soit chargé
-                    time.sleep(5)
                     print("✅ Successfully switched to content frame")
+                    # Attendre que le contenu du frame soit chargé et que les requêtes AJAX soient terminées
+                    try:
+                        wait.until(lambda driver: driver.execute_script(
+                            "return document.readyState === 'complete' && "
+                            "(typeof jQuery === 'undefined' || jQuery.active === 0)"))
+                        print("✅ Content frame loaded")
+                    except TimeoutException:
+                        print("⚠️ Warning: Content frame load timeout, continuing anyway")
                 except Exception as switch_error:
                     print(f"⚠️ Warning: Error switching to content frame: {switch_error}")
                     driver.switch_to.default_content()  # Retour au contexte principal
@@ -527,170 +649,123 @@ def navigate_to_schedule(driver, wait):
         raise BrowserNavigationError(f"Unexpected error navigating to schedule: {e}")
 
 
-def generate_schedule_pdf(driver, save_folder="pdfs", target_date=None):
-    """Génère un PDF de l'emploi du temps en ouvrant directement l'URL de l'iframe Agenda.asp"""
-    print("Generating schedule PDF... [VERSION: Direct iframe URL navigation]")
-    
-    # Créer le dossier s'il n'existe pas
-    if not os.path.exists(save_folder):
-        os.makedirs(save_folder)
-        print(f"Created folder: {save_folder}")
-    
-    # Attendre que la page soit bien chargée
-    print("Waiting for page to fully load...")
-    time.sleep(3)
-    
+def open_agenda(driver):
+    """Ouvre la page Agenda.asp de l'iframe dans l'onglet courant (une seule fois par session)"""
     # S'assurer qu'on est dans le bon frame (content) pour trouver l'iframe
     try:
-        print("🔍 Ensuring we're in the content frame to find iframe URL...")
+        print("Waiting for page to fully load...")
         driver.switch_to.default_content()  # Retour au contexte principal
-        driver.switch_to.frame("content")   # Puis switch vers content
+        WebDriverWait(driver, DEFAULT_TIMEOUT, poll_frequency=WAIT_POLL_INTERVAL).until(
+            EC.frame_to_be_available_and_switch_to_it("content"))  # Puis switch vers content
         print("✅ Switched to content frame")
         
         # Chercher l'iframe qui contient l'agenda et extraire son URL
         print("🔍 Looking for iframe URL in content frame...")
         try:
-            iframes = driver.find_elements(By.TAG_NAME, "iframe")
-            print(f"Found {len(iframes)} iframes in content frame")
+            get_iframe_srcs = "return Array.from(document.getElementsByTagName('iframe'), f => f.src);"
+            try:
+                # Le frame content peut encore être en train d'insérer l'iframe de l'agenda
+                WebDriverWait(driver, DEFAULT_TIMEOUT, poll_frequency=WAIT_POLL_INTERVAL).until(
+                    lambda driver: any("Agenda.asp" in src for src in driver.execute_script(get_iframe_srcs)))
+            except TimeoutException:
+                print("⚠️ Warning: Agenda iframe not detected, continuing anyway")
+            iframe_srcs = driver.execute_script(get_iframe_srcs)
+            print(f"Found {len(iframe_srcs)} iframes in content frame")
             
             agenda_iframe_url = None
-            for i, iframe in enumerate(iframes):
-                src = iframe.get_attribute("src")
-                print(f"  Iframe {i+1}: src='{src}'")
+            for i, src in enumerate(iframe_srcs):
+                dprint(f"  Iframe {i+1}: src='{src}'")
                 if src and "Agenda.asp" in src:
                     agenda_iframe_url = src
                     print(f"✅ Found agenda iframe URL: {src}")
                     break
             
             if agenda_iframe_url:
-                print("🌐 Opening iframe URL in NEW TAB...")
-                # Ouvrir un nouvel onglet et naviguer vers l'URL de l'iframe
-                driver.execute_script("window.open('');")
-                driver.switch_to.window(driver.window_handles[-1])  # Aller au nouvel onglet
+                print("🌐 Opening iframe URL as the top-level page...")
+                # Page.printToPDF imprime toujours le document principal de l'onglet: l'agenda
+                # doit donc être chargé au premier niveau. L'onglet courant suffit, la page
+                # PASS qui l'entoure ne sert plus après cette étape.
+                driver.switch_to.default_content()
                 driver.get(agenda_iframe_url)
                 
-                # Attendre que la page de l'agenda soit complètement chargée
-                print("⏳ Waiting for agenda page to load in new tab...")
-                time.sleep(8)
-                
-                # Vérifier que la page est bien chargée
-                page_length = len(driver.page_source)
-                links_count = len(driver.find_elements(By.TAG_NAME, "a"))
-                print(f"✅ Agenda page loaded: page_length={page_length}, links={links_count}")
+                # Attendre que les scripts de l'agenda soient disponibles
+                print("⏳ Waiting for agenda page to load...")
+                try:
+                    WebDriverWait(driver, DEFAULT_TIMEOUT, poll_frequency=WAIT_POLL_INTERVAL).until(
+                        lambda driver: driver.execute_script("return typeof NavDat === 'function'"))
+                except TimeoutException:
+                    print("⚠️ Warning: Agenda scripts not detected, continuing anyway")
                 
-                # Naviguer vers la date cible si spécifiée
-                if target_date:
-                    print(f"📅 Navigating to week of {target_date} in iframe...")
-                    try:
-                        driver.execute_script(f"NavDat('{target_date}');")
-                        time.sleep(3)
-                        print(f"✅ Successfully navigated to week of {target_date}")
-                    except Exception as e:
-                        print(f"⚠️ Could not navigate to date {target_date}: {e}")
+                # Vérifier que la page est bien chargée (page_source rapatrie tout le HTML)
+                if VERBOSE:
+                    page_length = len(driver.page_source)
+                    links_count = len(driver.find_elements(By.TAG_NAME, "a"))
+                    print(f"✅ Agenda page loaded: page_length={page_length}, links={links_count}")
+                else:
+                    print("✅ Agenda page loaded")
                 
             else:
                 print("❌ No agenda iframe found, staying in content frame")
                 
         except Exception as e:
             print(f"❌ Error looking for iframe: {e}")
-        
-        time.sleep(3)  # Délai supplémentaire pour être sûr
     except Exception as e:
         print(f"❌ Error in iframe navigation: {e}")
         # Si on ne peut pas trouver l'iframe, on continue quand même
-    
-    # Générer un nom de fichier propre : "GUERRY Roman – FIPA3R – S38.pdf"
-    pdf_filename = FileUtils.create_pdf_filename(target_date)
-    expected_pdf_path = os.path.join(save_folder, pdf_filename)
-    
-    # Si le fichier existe déjà, il sera overwrité
-    print(f"📄 PDF filename: {pdf_filename}")
-    
+
+
+def write_cdp_stream(driver, handle, output_file, chunk_size=CDP_READ_CHUNK_SIZE):
+    """Copie un flux CDP (IO.read) dans un fichier ouvert en binaire, puis le ferme"""
     try:
-        # Étape 1: Chercher le bouton d'impression de PASS AVANT tout autre chose
-        print("🔍 Looking for PASS print button...")
-        
-        # Essayer plusieurs sélecteurs pour trouver le bouton d'impression de PASS
-        selectors = [
-            "//a[@onclick and contains(@onclick, 'Imprimer')]",
-            "//a[contains(@onclick, 'Imprimer()')]", 
-            "//img[@src='/dataop/visuel/icones/16x16/Imprimer.gif']/..",
-            "//img[contains(@src, 'Imprimer.gif')]/..",
-            "//a[@title='Imprimer cette visualisation']",
-            "//img[contains(@src, 'print')]/..",
-            "//a[contains(@onclick, 'print')]",
-            "//a[contains(text(), 'Imprimer')]"
-        ]
-        
-        print_button = None
-        for selector in selectors:
-            try:
-                print(f"  Trying selector: {selector}")
-                print_button = driver.find_element(By.XPATH, selector)
-                onclick_attr = print_button.get_attribute("onclick")
-                print(f"✅ Found print button with selector: {selector}")
-                print(f"   onclick attribute: {onclick_attr}")
+        while True:
+            chunk = driver.execute_cdp_cmd('IO.read', {'handle': handle, 'size': chunk_size})
+            data = chunk.get('data', '')
+            if data:
+                if chunk.get('base64Encoded'):
+                    output_file.write(b64.b64decode(data, validate=True))
+                else:
+                    output_file.write(data.encode('latin-1'))
+            if chunk.get('eof'):
                 break
-            except Exception as e:
-                print(f"❌ Selector failed: {selector}")
-                continue
-        
-        if print_button is None:
-            print("❌ ERROR: Could not find PASS print button")
-            return None
-        
-        # Étape 2: Préparer l'interception de window.print() AVANT de cliquer
-        print("�️ Preparing to intercept window.print() and prevent Windows dialog...")
-        
-        # Remplacer window.print() par Chrome DevTools Protocol
+    finally:
+        driver.execute_cdp_cmd('IO.close', {'handle': handle})
+
+
+def fetch_pdf_bytes(driver, target_date=None):
+    """Affiche la semaine demandée dans l'agenda déjà ouvert et retourne le PDF imprimé (BytesIO) ou None"""
+    # Naviguer vers la date cible si spécifiée
+    if target_date:
+        print(f"📅 Navigating to week of {target_date} in iframe...")
+        try:
+            # Semaine déjà affichée (ex: répétée dans TARGET_WEEKS): rien à recharger
+            if driver.execute_script("return window.__passAgendaDate === arguments[0];", target_date):
+                print(f"✅ Week of {target_date} already displayed")
+            else:
+                # Garder une copie de l'agenda affiché: NavDat recharge la page ou la redessine
+                driver.execute_script(
+                    "window.__passAgendaHtml = document.body.innerHTML; NavDat(arguments[0]);", target_date)
+                try:
+                    WebDriverWait(driver, AGENDA_REDRAW_TIMEOUT, poll_frequency=WAIT_POLL_INTERVAL).until(
+                        lambda driver: driver.execute_script(
+                            "return document.readyState === 'complete' && typeof NavDat === 'function' && "
+                            "(typeof jQuery === 'undefined' || jQuery.active === 0) && "
+                            "window.__passAgendaHtml !== document.body.innerHTML"))
+                except TimeoutException:
+                    # Même balisage qu'avant (semaine courante au premier chargement, par exemple)
+                    dprint("🔍 Agenda markup unchanged after NavDat")
+                driver.execute_script("window.__passAgendaDate = arguments[0];", target_date)
+                print(f"✅ Successfully navigated to week of {target_date}")
+        except Exception as e:
+            print(f"⚠️ Could not navigate to date {target_date}: {e}")
+    
+    try:
+        # Appliquer directement le CSS d'impression de PASS, sans passer par le bouton Imprimer
+        print("🎨 Applying print stylesheet...")
         driver.execute_script("""
-            // Sauvegarder la fonction originale
-            window.originalPrint = window.print;
-            
-            // Remplacer window.print() par notre version qui utilise CDP
-            window.print = function() {
-                console.log('window.print() intercepted - will use Chrome DevTools Protocol instead');
-                
-                // Ajouter du CSS d'impression
-                var printStyle = document.createElement('style');
-                printStyle.innerHTML = `
-                    @media print {
-                        body { margin: 0; padding: 5px; font-size: 12px; }
-                        * { -webkit-print-color-adjust: exact !important; }
-                        .no-print, .noprint { display: none !important; }
-                        table { 
-                            page-break-inside: avoid; 
-                            border-collapse: collapse;
-                            width: 100% !important;
-                        }
-                    }
-                    @page { 
-                        size: A4 landscape; 
-                        margin: 0.5cm; 
-                    }
-                `;
-                document.head.appendChild(printStyle);
-                
-                // Déclencher un événement personnalisé pour notre script Python
-                window.dispatchEvent(new CustomEvent('passPrintRequested'));
-                
-                // NE PAS appeler la fonction print originale pour éviter le dialogue
-                return false;
-            };
-            
-            console.log('window.print() successfully overridden');
-        """)
-        
-        print("✅ window.print() override installed")
-        time.sleep(1)
-        
-        # Étape 3: Cliquer sur le bouton Imprimer de PASS
-        print("🖱️ Clicking PASS print button...")
-        print_button.click()
-        
-        # Étape 4: Attendre un court délai puis utiliser Chrome DevTools Protocol
-        print("⏳ Waiting for print request, then using Chrome DevTools Protocol...")
-        time.sleep(3)
+            var printStyle = document.createElement('style');
+            printStyle.innerHTML = arguments[0];
+            document.head.appendChild(printStyle);
+        """, PRINT_CSS)
         
         # Configuration d'impression pour Microsoft Print to PDF équivalente
         print_settings = {
@@ -709,43 +784,27 @@ def generate_schedule_pdf(driver, save_folder="pdfs", target_date=None):
             'footerTemplate': '',
             'preferCSSPageSize': False,
             'generateTaggedPDF': False,
-            'generateDocumentOutline': False
+            'generateDocumentOutline': False,
+            'transferMode': 'ReturnAsStream'  # Lire le PDF par morceaux plutôt qu'en une seule chaîne
         }
         
         print("📄 Generating PDF with Chrome DevTools Protocol...")
         result = driver.execute_cdp_cmd('Page.printToPDF', print_settings)
         
-        if 'data' in result:
+        if 'stream' in result or 'data' in result:
             print("✅ PDF generated successfully!")
             
-            # Décoder le PDF base64 et le sauvegarder
-            pdf_data = base64.b64decode(result['data'])
-            
-            # Sauvegarder le PDF temporaire avec un nom simple d'abord
-            temp_pdf_path = expected_pdf_path.replace('.pdf', '_temp.pdf')
-            full_temp_path = os.path.abspath(temp_pdf_path)
-            with open(full_temp_path, 'wb') as f:
-                f.write(pdf_data)
-            
-            print(f"📁 Temporary PDF saved to: {full_temp_path}")
-            
-            # Ajouter le message personnalisé au PDF avec nom temporaire
-            temp_final_path = expected_pdf_path.replace('.pdf', '_with_message.pdf')
-            pdf_message = os.getenv('PDF_MESSAGE', 'Emploi du temps généré automatiquement')
-            
-            if add_message_to_pdf(full_temp_path, temp_final_path, pdf_message):
-                # Supprimer le fichier temporaire sans message
-                os.remove(full_temp_path)
-                
-                # Renommer vers le nom final souhaité
-                final_path = FileUtils.safe_rename_pdf(temp_final_path, pdf_filename, save_folder)
-                print(f"📁 Final PDF saved to: {final_path}")
+            # Récupérer le PDF en mémoire: pas de fichier temporaire à réécrire puis relire
+            if 'stream' in result:
+                pdf_buffer = io.BytesIO()
+                write_cdp_stream(driver, result['stream'], pdf_buffer)
+                pdf_buffer.seek(0)
             else:
-                # En cas d'erreur, renommer le fichier temporaire directement
-                final_path = FileUtils.safe_rename_pdf(full_temp_path, pdf_filename, save_folder)
-                print(f"📁 PDF saved to: {final_path}")
-            
-            return final_path
+                # Chrome sans support du streaming: PDF entier en base64 dans 'data'.
+                # BytesIO partage le bytes décodé tant qu'on ne l'écrit pas: aucune copie.
+                # pop() libère la chaîne base64 dès la fin du décodage.
+                pdf_buffer = io.BytesIO(b64.b64decode(result.pop('data'), validate=True))
+            return pdf_buffer
         else:
             print("❌ CDP method failed, no data returned")
             return None
@@ -755,21 +814,61 @@ def generate_schedule_pdf(driver, save_folder="pdfs", target_date=None):
         return None
 
 
-def create_optimized_chrome_options(save_folder: str) -> Options:
+def finalize_pdf(pdf_buffer, save_folder, target_date=None):
+    """Signe le PDF imprimé et l'enregistre sous son nom final; retourne son chemin ou None"""
+    # Générer un nom de fichier propre : "GUERRY Roman – FIPA3R – S38.pdf"
+    pdf_filename = FileUtils.create_pdf_filename(target_date)
+    
+    # Si le fichier existe déjà, il sera overwrité
+    print(f"📄 PDF filename: {pdf_filename}")
+    
+    try:
+        # Ajouter le message personnalisé et la signature directement en mémoire
+        pdf_message = os.getenv('PDF_MESSAGE', 'Emploi du temps généré automatiquement')
+        signed_pdf = add_message_to_pdf_bytes(pdf_buffer, pdf_message)
+        
+        # Écrire le PDF signé directement sous son nom final
+        final_path = FileUtils.safe_write_pdf(signed_pdf, pdf_filename, save_folder)
+        print(f"📁 Final PDF saved to: {final_path}")
+        return final_path
+    
+    except Exception as e:
+        print(f"❌ Error during PDF generation: {e}")
+        return None
+
+
+def has_large_dev_shm(min_size: int = MIN_DEV_SHM_SIZE) -> bool:
+    """Indique si /dev/shm existe et offre au moins `min_size` octets pour Chrome."""
+    try:
+        return shutil.disk_usage('/dev/shm').total >= min_size
+    except OSError:
+        return False
+
+
+def create_optimized_chrome_options(save_folder: str, headless: bool = True) -> Options:
     """
     Crée une configuration Chrome optimisée pour l'automatisation PDF.
     
     Args:
         save_folder: Dossier de sauvegarde des PDF
+        headless: Lancer Chrome sans fenêtre (désactivé en mode debug)
         
     Returns:
         Options Chrome configurées
     """
     options = Options()
     
+    # Page.printToPDF fonctionne sans fenêtre, inutile de peindre l'interface
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--window-size=1920,1080')
+    
     # Performance et stabilité
     options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
+    # /dev/shm trop petit (Docker: 64 Mo par défaut) fait planter le rendu: repli sur /tmp.
+    # Sinon garder la mémoire partagée, bien plus rapide que des fichiers sur disque.
+    if sys.platform.startswith('linux') and not has_large_dev_shm():
+        options.add_argument('--disable-dev-shm-usage')
     options.add_argument('--disable-gpu')
     options.add_argument('--disable-extensions')
     options.add_argument('--disable-plugins')
@@ -777,6 +876,21 @@ def create_optimized_chrome_options(save_folder: str) -> Options:
     options.add_argument('--disable-backgrounding-occluded-windows')
     options.add_argument('--disable-renderer-backgrounding')
     
+    # Empreinte mémoire: couper les services de Chrome inutiles pour imprimer une page
+    options.add_argument('--disable-features=Translate,MediaRouter,OptimizationHints,IsolateOrigins,site-per-process')
+    options.add_argument('--renderer-process-limit=1')
+    options.add_argument('--js-flags=--max-old-space-size=256')
+    options.add_argument('--disable-sync')
+    options.add_argument('--disable-default-apps')
+    options.add_argument('--disable-component-update')
+    options.add_argument('--disable-background-networking')
+    options.add_argument('--disable-client-side-phishing-detection')
+    options.add_argument('--disable-hang-monitor')
+    options.add_argument('--metrics-recording-only')
+    options.add_argument('--no-first-run')
+    options.add_argument('--no-default-browser-check')
+    options.add_argument('--mute-audio')
+    
     # Impression automatique
     options.add_argument('--kiosk-printing')
     options.add_argument('--disable-print-preview')
@@ -784,6 +898,7 @@ def create_optimized_chrome_options(save_folder: str) -> Options:
     options.add_argument('--use-fake-ui-for-media-stream')
     
     # Préférences optimisées
+    download_folder = os.path.abspath(save_folder)
     prefs = {
         "printing.print_preview_sticky_settings.appState": {
             "recentDestinations": [{
@@ -801,24 +916,113 @@ def create_optimized_chrome_options(save_folder: str) -> Options:
             "shouldPrintBackgrounds": True,
             "shouldPrintSelectionOnly": False
         },
-        "savefile.default_directory": os.path.abspath(save_folder),
-        "download.default_directory": os.path.abspath(save_folder),
+        "savefile.default_directory": download_folder,
+        "download.default_directory": download_folder,
         "download.prompt_for_download": False,
         "plugins.always_open_pdf_externally": False,
         "printing.use_system_print_dialog": False,
         "printing.print_preview_disabled": True,
-        "profile.default_content_setting_values.notifications": 2
+        "profile.default_content_setting_values.notifications": 2,
+        "profile.default_content_setting_values.media_stream": 2,
+        "profile.password_manager_enabled": False,
+        "credentials_enable_service": False
     }
     options.add_experimental_option("prefs", prefs)
     
     return options
 
 
-def main(username, password, nom_prenom, promo, target_date, save_folder, debug_mode):
+# NO_PROXY n'a besoin d'être complété qu'une fois par processus
+_no_proxy_configured = False
+
+
+def configure_no_proxy() -> None:
+    """Exclut localhost du proxy (WSL2 et environnements similaires) pour joindre chromedriver."""
+    global _no_proxy_configured
+    if _no_proxy_configured:
+        return
+    no_proxy = os.environ.get("NO_PROXY", "")
+    needed = ["127.0.0.1", "localhost", "::1"]
+    for host in needed:
+        if host not in no_proxy:
+            no_proxy = f"{no_proxy},{host}" if no_proxy else host
+    os.environ["NO_PROXY"] = no_proxy
+    os.environ["no_proxy"] = no_proxy
+    _no_proxy_configured = True
+
+
+# Navigateur partagé entre les générations successives (relances en mode debug)
+_driver = None
+
+
+def get_or_create_driver(options: Options):
+    """Retourne le navigateur déjà lancé, ou en démarre un avec ces options."""
+    global _driver
+    if _driver is None:
+        _driver = webdriver.Chrome(options=options)
+    return _driver
+
+
+def reset_driver() -> None:
+    """Remet le navigateur partagé dans un état propre avant une nouvelle génération."""
+    global _driver
+    if _driver is None:
+        return
+    try:
+        _driver.get('about:blank')  # Libère le rendu de l'agenda précédent
+        _driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        _driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+    except WebDriverException as e:
+        # Navigateur fermé entre-temps: en relancer un au prochain appel
+        print(f"⚠️ Warning: Could not reset browser, a new one will be started: {e}")
+        close_driver()
+
+
+def close_driver() -> None:
+    """Ferme le navigateur partagé s'il est ouvert."""
+    global _driver
+    if _driver is None:
+        return
+    try:
+        _driver.quit()
+        print("✅ Browser closed successfully")
+    except Exception as cleanup_error:
+        print(f"⚠️ Warning: Error closing browser: {cleanup_error}")
+    _driver = None
+
+
+def wait_for_enter(timeout: float) -> bool:
+    """
+    Attend que l'utilisateur appuie sur Entrée, au plus `timeout` secondes.
+    
+    Retourne False sans attendre si stdin n'est pas un terminal (GUI, cron),
+    ainsi qu'à expiration du délai ou en fin de flux.
+    """
+    if sys.stdin is None or not sys.stdin.isatty():
+        return False
+    
+    # select() ne fonctionne pas sur la console Windows: lecture dans un thread
+    lines = []
+    answered = threading.Event()
+    
+    def read_line():
+        lines.append(sys.stdin.readline())
+        answered.set()
+    
+    threading.Thread(target=read_line, daemon=True).start()
+    deadline = time.monotonic() + timeout
+    while not answered.wait(0.2):  # attentes courtes: Ctrl+C reste pris en compte
+        if time.monotonic() >= deadline:
+            return False
+    return lines[0] != ''
+
+
+def main(username, password, nom_prenom, promo, target_dates, save_folder, debug_mode):
     """Fonction principale avec gestion d'erreurs complète."""
     print("🚀 Starting schedule PDF generation process...")
     
     driver = None
+    browser_closer = None
     
     try:
         # Validation de la configuration
@@ -837,70 +1041,80 @@ def main(username, password, nom_prenom, promo, target_date, save_folder, debug_
 
 
 
-        # Ensure localhost is not proxied (for WSL2 and similar environments)
-        no_proxy = os.environ.get("NO_PROXY", "")
-        needed = ["127.0.0.1", "localhost", "::1"]
-        for host in needed:
-            if host not in no_proxy:
-                no_proxy = f"{no_proxy},{host}" if no_proxy else host
-        os.environ["NO_PROXY"] = no_proxy
-        os.environ["no_proxy"] = no_proxy
-
+        configure_no_proxy()
 
         print(f"✅ Configuration validated for {nom_prenom} ({promo})")
     
 
-        # Créer le dossier de sauvegarde
+        # Créer le dossier de sauvegarde (chemin absolu calculé une seule fois)
+        save_folder = os.path.abspath(save_folder)
         try:
             FileUtils.ensure_directory_exists(save_folder)
-            print(f"✅ Save folder ready: {os.path.abspath(save_folder)}")
+            print(f"✅ Save folder ready: {save_folder}")
         except Exception as e:
             raise ScheduleGenerationError(f"Failed to create save folder: {e}")
         
         # Configuration Chrome optimisée
         try:
-            options = create_optimized_chrome_options(save_folder)
+            options = create_optimized_chrome_options(save_folder, headless=not debug_mode)
             print("✅ Chrome options configured")
         except Exception as e:
             raise ScheduleGenerationError(f"Failed to configure Chrome options: {e}")
         
         # Démarrer le navigateur
         try:
-            driver = webdriver.Chrome(options=options)
-            wait = WebDriverWait(driver, 60)
+            driver = get_or_create_driver(options)
+            wait = WebDriverWait(driver, 60, poll_frequency=WAIT_POLL_INTERVAL)
             print("✅ Chrome browser started")
         except Exception as e:
             raise ScheduleGenerationError(f"Failed to start Chrome browser: {e}")
         
-        # Se connecter à PASS
-        print("🔐 Starting login process...")
-        try:
-            login(driver, wait, username, password)
-            print("✅ Login successful")
-        except BrowserNavigationError as e:
-            raise ScheduleGenerationError(f"Login failed: {e}")
+        # Se connecter à PASS (en réutilisant la session précédente si possible)
+        reuse_session = os.getenv('REUSE_SESSION', 'true').lower() in ('1', 'true')
+        session_restored = reuse_session and restore_session(driver, username)
+        if not session_restored:
+            print("🔐 Starting login process...")
+            try:
+                login(driver, wait, username, password)
+                print("✅ Login successful")
+            except BrowserNavigationError as e:
+                raise ScheduleGenerationError(f"Login failed: {e}")
+            if reuse_session:
+                save_session_cookies(driver, username)
         
         # Naviguer vers l'emploi du temps
         print("🧭 Navigating to schedule...")
         try:
-            navigate_to_schedule(driver, wait)
+            navigate_to_schedule(driver, wait, reload=not session_restored)
             print("✅ Navigation successful")
         except BrowserNavigationError as e:
             raise ScheduleGenerationError(f"Navigation failed: {e}")
         
-        # Générer le PDF en utilisant la fonction Imprimer() de PASS
+        # Générer un PDF par semaine dans le même onglet de l'agenda
         print("📄 Generating PDF...")
+        pdf_paths = []
         try:
-            pdf_path = generate_schedule_pdf(driver, save_folder, target_date)
-            print(f"✅ PDF generated: {pdf_path}")
+            open_agenda(driver)
+            printed_weeks = [(target_date, fetch_pdf_bytes(driver, target_date)) for target_date in target_dates]
+            
+            # Le navigateur ne sert plus: le fermer pendant la signature des PDF
+            if not debug_mode:
+                browser_closer = threading.Thread(target=close_driver, daemon=True)
+                browser_closer.start()
+            
+            for target_date, pdf_buffer in printed_weeks:
+                pdf_path = finalize_pdf(pdf_buffer, save_folder, target_date) if pdf_buffer else None
+                print(f"✅ PDF generated: {pdf_path}")
+                if pdf_path:
+                    pdf_paths.append(pdf_path)
         except (ScheduleGenerationError, PDFProcessingError) as e:
             raise ScheduleGenerationError(f"PDF generation failed: {e}")
         
         # Message de confirmation final
-        date_info = f" (semaine du {target_date})" if target_date else ""
+        date_info = f" (semaine du {', '.join(target_dates)})" if target_dates else ""
         print(f"🎉 PDF de l'emploi du temps généré avec succès{date_info}!")
-        print(f"📁 Dossier: {os.path.abspath(save_folder)}")
-        if pdf_path:
+        print(f"📁 Dossier: {save_folder}")
+        for pdf_path in pdf_paths:
             print(f"📄 Fichier: {os.path.basename(pdf_path)}")
 
     except ScheduleGenerationError as e:
@@ -914,20 +1128,17 @@ def main(username, password, nom_prenom, promo, target_date, save_folder, debug_
         return 1
     except Exception as e:
         print(f"❌ Erreur inattendue: {e}")
-        import traceback
         traceback.print_exc()
         return 1
     finally:
+        if browser_closer is not None:
+            browser_closer.join()
         if driver:
-            try:
-                if debug_mode:
-                    print("🔍 DEBUG MODE: Navigateur laissé ouvert pour inspection")
-                    print("Appuyez sur Entrée pour fermer le navigateur...")
-                    input()
-                driver.quit()
-                print("✅ Browser closed successfully")
-            except Exception as cleanup_error:
-                print(f"⚠️ Warning: Error closing browser: {cleanup_error}")
+            if debug_mode:
+                # Conservé pour l'inspection et réutilisé si l'on relance
+                print("🔍 DEBUG MODE: Navigateur laissé ouvert pour inspection")
+            else:
+                close_driver()
     
     return 0
 
@@ -946,15 +1157,21 @@ if __name__ == "__main__":
     # TARGET_WEEK : numéro de semaine ISO (ex: '38' pour semaine 38)
     # TARGET_DATE : date spécifique au format YYYYMMDD (ex: '20250915') 
     # WEEKS_OFFSET : nombre de semaines à partir de maintenant (ex: '0', '1', '-1')
-    target_date = DateUtils.get_target_date()  # Utilise la méthode moderne des utilitaires
+    # TARGET_WEEKS : liste de semaines ISO (ex: '38,39,40'), prioritaire sur les précédentes
+    target_dates = DateUtils.get_target_dates()  # Utilise la méthode moderne des utilitaires
     save_folder = os.getenv('SAVE_FOLDER', 'pdfs')  # Dossier de sauvegarde pour PDFs
     debug_mode = os.getenv('DEBUG_MODE', 'false').lower() == 'true'  # Mode debug
+    try:
+        debug_timeout = float(os.getenv('DEBUG_TIMEOUT', '30'))  # Attente max avant de quitter en mode debug
+    except ValueError:
+        debug_timeout = 30.0
+    VERBOSE = debug_mode  # Détails de diagnostic uniquement en mode debug
 
-    print(f"Configuration: username={username}, target_date={target_date}, save_folder={save_folder}, debug_mode={debug_mode}")
+    print(f"Configuration: username={username}, target_dates={target_dates}, save_folder={save_folder}, debug_mode={debug_mode}")
     
     # Vérification du fichier de signature
     signature_file = os.getenv('SIGNATURE_FILE', 'signature.png')
-    if not os.path.exists(signature_file):
+    if not os.path.exists(SIGNATURE_PATH):
         print(f"❌ ERREUR: Le fichier de signature '{signature_file}' est introuvable.")
         print("   Assurez-vous que le fichier existe dans le répertoire courant.")
         print("   Ou modifiez la variable SIGNATURE_FILE dans votre fichier .env ou sur l'interface utilisateur.")
@@ -963,26 +1180,30 @@ if __name__ == "__main__":
         print(f"✅ Fichier de signature trouvé: {signature_file}")
     
     try:
-        # Message de début
-        print("📄 Starting schedule PDF generation...")
-        
-        # Exécuter la génération PDF
-        main(username, password, nom_prenom, promo, target_date, save_folder, debug_mode)
-        
-        # Message de fin
-        print("✅ Schedule PDF generation completed")
-        
-        # En mode debug, proposer de relancer
-        if debug_mode:
-            print("🔍 DEBUG MODE: Voulez-vous relancer ? (Entrée = Oui, Ctrl+C = Non)")
-            try:
-                input()
-                print("Relancement...")
-                # Note: En mode debug, on pourrait ajouter une boucle ici si souhaité
-            except KeyboardInterrupt:
-                print("🛑 Script arrêté par l'utilisateur.")
-        else:
-            print("✅ Script terminé avec succès.")
+        while True:
+            # Message de début
+            print("📄 Starting schedule PDF generation...")
+            
+            # Exécuter la génération PDF
+            main(username, password, nom_prenom, promo, target_dates, save_folder, debug_mode)
+            
+            # Message de fin
+            print("✅ Schedule PDF generation completed")
+            
+            if not debug_mode:
+                print("✅ Script terminé avec succès.")
+                break
+            
+            # En mode debug, proposer de relancer avec le même navigateur
+            print(f"🔍 DEBUG MODE: Voulez-vous relancer ? (Entrée = Oui, Ctrl+C = Non, {debug_timeout:g}s max)")
+            sys.stdout.flush()
+            if not wait_for_enter(debug_timeout):
+                print("⏱️ Pas de relance demandée, fermeture du navigateur.")
+                break
+            print("Relancement...")
+            reset_driver()
                 
     except KeyboardInterrupt:
-        print("🛑 Script arrêté par l'utilisateur.")
\ No newline at end of file
+        print("🛑 Script arrêté par l'utilisateur.")
+    finally:
+        close_driver()